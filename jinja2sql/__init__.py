@@ -1,3 +1,3 @@
-from ._core import Jinja2SQL
+from ._core import Jinja2SQL, MemoryBytecodeCache
 
-__all__ = ["Jinja2SQL"]
+__all__ = ["Jinja2SQL", "MemoryBytecodeCache"]
@@ -1,23 +1,30 @@
 from __future__ import annotations
 
-import contextlib
+import copy
+import functools
+import hashlib
 import inspect
 import os
-from collections.abc import Iterable, Iterator, Mapping, Sequence
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable, Mapping, Sequence
 from contextvars import ContextVar
 from typing import Any, Callable, Protocol, TypeVar, Union, overload
 
 import jinja2
 import jinja2.defaults
 import jinja2.nodes
+from jinja2.bccache import Bucket
 from jinja2.ext import Extension
 from jinja2.lexer import Token, TokenStream
 from jinja2.parser import Parser
+from jinja2.runtime import Undefined
 from markupsafe import Markup
 from typing_extensions import Literal, ParamSpec, TypeAlias
 
 _T_co = TypeVar("_T_co", covariant=True)
 T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
 P = ParamSpec("P")
 
 
@@ -32,12 +39,59 @@ Context: TypeAlias = Mapping[str, Any]
 DEFAULT_IDENTIFIER_QUOTE_CHAR = ""
 DEFAULT_PARAM_STYLE: ParamStyle = "named"
 
+_PARAM_STYLE_FORMATTERS: dict[str, ParamStyleFunc] = {
+    "named": lambda param_key, param_index: f":{param_key}",
+    "qmark": lambda param_key, param_index: "?",
+    "format": lambda param_key, param_index: "%s",
+    "numeric": lambda param_key, param_index: f":{param_index}",
+    "pyformat": lambda param_key, param_index: f"%({param_key})s",
+    "asyncpg": lambda param_key, param_index: f"${param_index}",
+}
+_POSITIONAL_PARAM_STYLES = ("qmark", "format", "numeric", "asyncpg")
+# Bump whenever Jinja2SQLExtension changes the compiled code, so on-disk bytecode
+# written by an older version is never loaded
+_BYTECODE_CACHE_VERSION = 1
+_RENDER_CACHE_SCALAR_TYPES = frozenset((str, bytes, int, bool, type(None)))
+
+
+class _LRUCache(OrderedDict[K, V]):
+    """Least recently used cache.
+
+    A capacity of 0 disables the cache and a negative capacity makes it unbounded.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        super().__init__()
+        self.capacity = capacity
+
+    def lookup(self, key: K) -> V | None:
+        """Get a cached value and mark it as recently used."""
+        try:
+            self.move_to_end(key)
+            return self[key]
+        except KeyError:
+            return None
+
+    def store(self, key: K, value: V) -> None:
+        """Cache a value, evicting the least recently used one if full."""
+        if self.capacity == 0:
+            return
+        self[key] = value
+        if 0 < self.capacity < len(self):
+            self.popitem(last=False)
+
 
 class RenderContext:
     __slots__ = (
         "param_style",
         "identifier_quote_char",
-        "_params",
+        "escaped_identifier_quote_char",
+        "format_param",
+        "_positional",
+        "_keyed",
+        "_param_keys",
+        "_param_values",
+        "_named_params",
         "_param_index",
     )
 
@@ -46,37 +100,101 @@ class RenderContext:
         param_style: ParamStyle | ParamStyleFunc,
         identifier_quote_char: str,
     ) -> None:
-        self._params: list[Any] | dict[str, Any] = {}
-        if _is_positional_param_style(param_style):
-            self._params = []
+        self._positional = _is_positional_param_style(param_style)
+        # Built-in positional styles never use the param key
+        self._keyed = param_style not in _POSITIONAL_PARAM_STYLES
+        self._param_keys: list[str] = []
+        self._param_values: list[Any] = []
+        self._named_params: dict[str, Any] | None = None
         self._param_index: int = 0
         self.param_style = param_style
         self.identifier_quote_char = identifier_quote_char
+        self.escaped_identifier_quote_char = identifier_quote_char * 2
+        self.format_param = _resolve_param_style_func(param_style)
 
     @property
     def params(self) -> Params:
         """Get the parameters."""
-        return self._params
+        if self._positional:
+            return self._param_values
+        named_params = self._named_params
+        if named_params is None or len(named_params) != len(self._param_keys):
+            named_params = self._named_params = dict(
+                zip(self._param_keys, self._param_values)
+            )
+        return named_params
 
     def bind_param(
         self, name: str, value: Any, *, in_clause: bool = False
     ) -> tuple[str, int]:
         """Bind a parameter."""
-        if jinja2.is_undefined(value):
+        if isinstance(value, Undefined):
             raise jinja2.UndefinedError(f"Undefined parameter '{name}' used in query.")
         self._param_index += 1
+        self._param_values.append(value)
+        if not self._keyed:
+            return "", self._param_index
+        param_key_prefix = name.replace(".", "__") if "." in name else name
         if in_clause:
-            param_key_suffix = f"__in__{self._param_index}"
-        else:
-            param_key_suffix = f"__{self._param_index}"
-        param_key = f"{name.replace('.', '__')}{param_key_suffix}"
-        if isinstance(self._params, dict):
-            self._params[param_key] = value
+            param_key = f"{param_key_prefix}__in__{self._param_index}"
         else:
-            self._params.append(value)
+            param_key = f"{param_key_prefix}__{self._param_index}"
+        self._param_keys.append(param_key)
         return param_key, self._param_index
 
 
+class MemoryBytecodeCache(jinja2.BytecodeCache):
+    """In-memory least recently used bytecode cache.
+
+    The bytecode is keyed by the environment settings that change the compiled
+    code too, so environments with different settings can share the cache.
+    A capacity of 0 disables the cache and a negative capacity makes it unbounded.
+    """
+
+    def __init__(self, capacity: int = 400) -> None:
+        self._cache: _LRUCache[Hashable, bytes] = _LRUCache(capacity)
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        """Load the bytecode into the bucket."""
+        if (bytecode := self._cache.lookup(self._bucket_key(bucket))) is not None:
+            bucket.bytecode_from_string(bytecode)
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        """Dump the bytecode of the bucket."""
+        self._cache.store(self._bucket_key(bucket), bucket.bytecode_to_string())
+
+    @staticmethod
+    def _bucket_key(bucket: Bucket) -> Hashable:
+        """Get the cache key of a bucket."""
+        environment = bucket.environment
+        return bucket.key, _compile_settings(environment), environment.finalize
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        self._cache.clear()
+
+
+class _RenderScope:
+    """Set the render context for the duration of a render."""
+
+    __slots__ = ("_render_context_var", "_render_context", "_token")
+
+    def __init__(
+        self,
+        render_context_var: ContextVar[RenderContext | None],
+        render_context: RenderContext,
+    ) -> None:
+        self._render_context_var = render_context_var
+        self._render_context = render_context
+
+    def __enter__(self) -> RenderContext:
+        self._token = self._render_context_var.set(self._render_context)
+        return self._render_context
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._render_context_var.reset(self._token)
+
+
 class Jinja2SQL:
     def __init__(
         self,
@@ -103,13 +221,24 @@ class Jinja2SQL:
         cache_size: int = 400,
         auto_reload: bool = True,
         bytecode_cache: jinja2.BytecodeCache | None = None,
+        bytecode_cache_dir: str | os.PathLike[str] | None = None,
         enable_async: bool = False,
         param_style: ParamStyle = DEFAULT_PARAM_STYLE,
         identifier_quote_char: str = DEFAULT_IDENTIFIER_QUOTE_CHAR,
+        render_cache_size: int = 0,
+        compiled_path: str
+        | os.PathLike[str]
+        | Sequence[str | os.PathLike[str]]
+        | None = None,
     ):
+        if searchpath and compiled_path:
+            raise ValueError("Pass either searchpath or compiled_path, not both.")
+
         # Set the Jinja loader
-        loader: jinja2.FileSystemLoader | None = None
-        if searchpath:
+        loader: jinja2.BaseLoader | None = None
+        if compiled_path:
+            loader = jinja2.ModuleLoader(compiled_path)
+        elif searchpath:
             loader = jinja2.FileSystemLoader(searchpath=searchpath)
 
         self.param_style = param_style
@@ -140,6 +269,21 @@ class Jinja2SQL:
             loader=loader,
         )
 
+        # Set the Jinja bytecode cache, the file name of the on-disk cache includes
+        # the settings that change the compiled code, so they never load each other
+        if bytecode_cache is None and bytecode_cache_dir is not None:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            cache_settings = (_BYTECODE_CACHE_VERSION, _compile_settings(self._env))
+            settings_digest = hashlib.sha1(
+                repr(cache_settings).encode("utf-8")
+            ).hexdigest()
+            self._env.bytecode_cache = jinja2.FileSystemBytecodeCache(
+                directory=os.fspath(bytecode_cache_dir),
+                pattern=f"__jinja2sql_{settings_digest}_%s.cache",
+            )
+        elif bytecode_cache is None:
+            self._env.bytecode_cache = MemoryBytecodeCache(cache_size)
+
         # Default filters
         self._env.filters["bind"] = self.bind
         self._env.filters["_bind_in"] = self.bind_in_clause
@@ -147,6 +291,14 @@ class Jinja2SQL:
         self._env.filters["inclause"] = lambda value: value
         self._env.filters["identifier"] = self.identifier
 
+        # Set the string template and rendered query caches
+        self._string_template_cache: _LRUCache[str, jinja2.Template] = _LRUCache(
+            cache_size
+        )
+        self._render_cache: _LRUCache[Hashable, tuple[str, Params]] = _LRUCache(
+            render_cache_size
+        )
+
         # Set the context variable
         self._render_context_var: ContextVar[RenderContext | None] = ContextVar(
             "render_context", default=None
@@ -196,6 +348,14 @@ class Jinja2SQL:
 
         return decorator(func)
 
+    def precompile(
+        self,
+        target: str | os.PathLike[str],
+        compression: Literal["deflated", "stored"] | None = "deflated",
+    ) -> None:
+        """Precompile all templates into a zip archive or a directory."""
+        self._env.compile_templates(target, zip=compression)
+
     def from_file(
         self,
         name: str | jinja2.Template,
@@ -208,9 +368,9 @@ class Jinja2SQL:
         with self._begin_render_context(
             param_style=param_style,
             identifier_quote_char=identifier_quote_char,
-        ):
+        ) as render_context:
             template = self.env.get_template(name)
-            return self._render(template, context)
+            return self._render(template, context, render_context)
 
     def from_string(
         self,
@@ -224,9 +384,9 @@ class Jinja2SQL:
         with self._begin_render_context(
             param_style=param_style,
             identifier_quote_char=identifier_quote_char,
-        ):
-            template = self.env.from_string(source)
-            return self._render(template, context)
+        ) as render_context:
+            template = self._get_string_template(source)
+            return self._render(template, context, render_context)
 
     async def from_file_async(
         self,
@@ -237,12 +397,13 @@ class Jinja2SQL:
         identifier_quote_char: str | None = None,
     ) -> tuple[str, Params]:
         """Load a template from a file asynchronously."""
+        self._check_async_enabled()
         with self._begin_render_context(
             param_style=param_style,
             identifier_quote_char=identifier_quote_char,
-        ):
+        ) as render_context:
             template = self.env.get_template(name)
-            return await self._render_async(template, context)
+            return await self._render_async(template, context, render_context)
 
     async def from_string_async(
         self,
@@ -253,12 +414,32 @@ class Jinja2SQL:
         identifier_quote_char: str | None = None,
     ) -> tuple[str, Params]:
         """Load a template from a string asynchronously."""
+        self._check_async_enabled()
         with self._begin_render_context(
             param_style=param_style,
             identifier_quote_char=identifier_quote_char,
-        ):
+        ) as render_context:
+            template = self._get_string_template(source)
+            return await self._render_async(template, context, render_context)
+
+    def _check_async_enabled(self) -> None:
+        """Check that async rendering is enabled."""
+        if not self.env.is_async:
+            raise RuntimeError(
+                "Async rendering is disabled, create Jinja2SQL with enable_async=True."
+            )
+
+    def _get_string_template(
+        self, source: str | jinja2.nodes.Template
+    ) -> jinja2.Template:
+        """Get a compiled template from a string, using the template cache."""
+        if not isinstance(source, str):
+            return self.env.from_string(source)
+        cache = self._string_template_cache
+        if (template := cache.lookup(source)) is None:
             template = self.env.from_string(source)
-            return await self._render_async(template, context)
+            cache.store(source, template)
+        return template
 
     @property
     def _render_context(self) -> RenderContext:
@@ -267,96 +448,133 @@ class Jinja2SQL:
             raise RuntimeError("Outside of a render context.")
         return render_context
 
-    @contextlib.contextmanager
     def _begin_render_context(
         self,
         param_style: ParamStyle | ParamStyleFunc | None = None,
         identifier_quote_char: str | None = None,
-    ) -> Iterator[None]:
+    ) -> _RenderScope:
         """Begin a render context."""
-        token = self._render_context_var.set(
+        return _RenderScope(
+            self._render_context_var,
             RenderContext(
                 param_style=param_style or self.param_style,
                 identifier_quote_char=identifier_quote_char
                 or self.identifier_quote_char,
-            )
+            ),
         )
-        try:
-            yield
-        finally:
-            self._render_context_var.reset(token)
 
     def _render(
-        self, template: jinja2.Template, context: Context | None
+        self,
+        template: jinja2.Template,
+        context: Context | None,
+        render_context: RenderContext,
     ) -> tuple[str, Params]:
         """Render a template."""
+        cache_key = self._render_cache_key(template, context, render_context)
+        if (
+            cache_key is not None
+            and (cached := self._render_cache.lookup(cache_key)) is not None
+        ):
+            return cached[0], copy.copy(cached[1])
         query = template.render(context or {})
-        return query, self._render_context.params
+        return self._store_rendered(cache_key, query, render_context.params)
 
     async def _render_async(
-        self, template: jinja2.Template, context: Context | None
+        self,
+        template: jinja2.Template,
+        context: Context | None,
+        render_context: RenderContext,
     ) -> tuple[str, Params]:
         """Render a template asynchronously."""
+        cache_key = self._render_cache_key(template, context, render_context)
+        if (
+            cache_key is not None
+            and (cached := self._render_cache.lookup(cache_key)) is not None
+        ):
+            return cached[0], copy.copy(cached[1])
         query = await template.render_async(context or {})
-        return query, self._render_context.params
+        return self._store_rendered(cache_key, query, render_context.params)
 
-    def _bind_param(self, key: str, value: Any, *, in_clause: bool = False) -> str:
-        """Bind a parameter."""
-        param_key, param_index = self._render_context.bind_param(
-            key, value, in_clause=in_clause
+    def _render_cache_key(
+        self,
+        template: jinja2.Template,
+        context: Context | None,
+        render_context: RenderContext,
+    ) -> Hashable | None:
+        """Get the rendered query cache key, or None if it can't be cached."""
+        if self._render_cache.capacity == 0:
+            return None
+        try:
+            context_key = (
+                tuple(
+                    sorted(
+                        (name, _render_cache_value_key(value))
+                        for name, value in context.items()
+                    )
+                )
+                if context
+                else ()
+            )
+        except TypeError:
+            return None
+        return (
+            template,
+            render_context.param_style,
+            render_context.identifier_quote_char,
+            context_key,
         )
-        if callable(param_style := self._render_context.param_style):
-            return param_style(param_key, param_index)
-        elif param_style == "named":
-            return f":{param_key}"
-        elif param_style == "qmark":
-            return "?"
-        elif param_style == "format":
-            return "%s"
-        elif param_style == "numeric":
-            return f":{param_index}"
-        elif param_style == "pyformat":
-            return f"%({param_key})s"
-        elif param_style == "asyncpg":
-            return f"${param_index}"
-        raise ValueError(f"Invalid param_style - {param_style}")
+
+    def _store_rendered(
+        self, cache_key: Hashable | None, query: str, params: Params
+    ) -> tuple[str, Params]:
+        """Store a rendered query in the cache."""
+        if cache_key is not None:
+            self._render_cache.store(cache_key, (query, copy.copy(params)))
+        return query, params
 
     def bind(self, value: Any, name: str) -> Markup | str:
         """Bind a parameter."""
         if isinstance(value, Markup):
             return value
-        return self._bind_param(name, value)
+        # Read the context variable directly, this is the hottest filter
+        if (render_context := self._render_context_var.get()) is None:
+            raise RuntimeError("Outside of a render context.")
+        return render_context.format_param(*render_context.bind_param(name, value))
 
     def bind_in_clause(self, value: Any, name: str) -> str:
         """Bind an IN clause."""
-        values = list(value)
-        results = []
-        for item in values:
-            results.append(self._bind_param(name, item, in_clause=True))
-        return f"({', '.join(results)})"
+        render_context = self._render_context
+        bind_param = render_context.bind_param
+        format_param = render_context.format_param
+        placeholders = ", ".join(
+            format_param(*bind_param(name, item, in_clause=True)) for item in value
+        )
+        return f"({placeholders})"
 
     def identifier(self, value: Any) -> Markup:
         """Format an identifier."""
         if isinstance(value, str):
-            identifier = (value,)
+            identifier: Iterable[str] = (value,)
         else:
-            identifier = value
-        if not isinstance(value, Iterable):
-            raise ValueError("identifier filter expects a string or an Iterable")
-
-        def _quote_and_escape(item: str) -> str:
-            return "".join(
-                [
-                    self._render_context.identifier_quote_char,
-                    item.replace(
-                        self._render_context.identifier_quote_char,
-                        self._render_context.identifier_quote_char * 2,
-                    ),
-                    self._render_context.identifier_quote_char,
-                ]
+            try:
+                identifier = iter(value)
+            except TypeError:
+                raise ValueError(
+                    "identifier filter expects a string or an Iterable"
+                ) from None
+
+        render_context = self._render_context
+        quote = render_context.identifier_quote_char
+        escaped_quote = render_context.escaped_identifier_quote_char
+        if not quote:
+            return Markup(".".join(identifier))
+
+        return Markup(
+            ".".join(
+                f"{quote}{item.replace(quote, escaped_quote)}{quote}"
+                for item in identifier
             )
-
-        return Markup(".".join(_quote_and_escape(item) for item in identifier))
+        )
 
 
 class Jinja2SQLExtension(Extension):
@@ -369,70 +587,129 @@ class Jinja2SQLExtension(Extension):
         return []
 
     def filter_stream(self, stream: TokenStream) -> Iterable[Token]:
-        """Filter the stream."""
+        """Filter the stream.
+
+        Changes to the emitted tokens must bump _BYTECODE_CACHE_VERSION.
+        """
+        skip_filters = self.skip_filters
+        next_token = stream.__next__
         while not stream.eos:
-            token = next(stream)
-            if token.test("variable_begin"):
-                var_expr = []
-                while not token.test("variable_end"):
-                    var_expr.append(token)
-                    token = next(stream)
-                variable_end = token
-                last_token = var_expr[-1]
-                lineno = last_token.lineno
-                if (
-                    not last_token.test("name")
-                    or last_token.value not in self.skip_filters
-                ):
-                    if last_token.value == "inclause":
-                        filter_name = "_bind_in"
+            token = next_token()
+            yield token
+            if token.type != "variable_begin":
+                continue
+            # Wrap the expression in parentheses up front, so its tokens can be
+            # streamed through before knowing whether a bind filter follows
+            yield Token(token.lineno, "lparen", "(")
+            key: list[tuple[str, str]] = []
+            in_key = True
+            last_token = token
+            token = next_token()
+            while token.type != "variable_end":
+                if in_key:
+                    if token.type == "name" or token.type == "dot":
+                        key.append((token.type, token.value))
                     else:
-                        filter_name = "bind"
-
-                    param_name = self._extract_param_name(var_expr)
-
-                    var_expr.insert(1, Token(lineno, "lparen", "("))
-                    var_expr.append(Token(lineno, "rparen", ")"))
-                    var_expr.append(Token(lineno, "pipe", "|"))
-                    var_expr.append(Token(lineno, "name", filter_name))
-                    var_expr.append(Token(lineno, "lparen", "("))
-                    var_expr.append(Token(lineno, "string", param_name))
-                    var_expr.append(Token(lineno, "rparen", ")"))
-
-                var_expr.append(variable_end)
-                for token in var_expr:
-                    yield token
-            else:
+                        in_key = False
                 yield token
+                last_token = token
+                token = next_token()
+            if last_token.type == "name" and last_token.value in skip_filters:
+                yield Token(last_token.lineno, "rparen", ")")
+            else:
+                if last_token.value == "inclause":
+                    filter_name = "_bind_in"
+                else:
+                    filter_name = "bind"
+
+                if len(key) == 1:
+                    # Fast path for the common '{{ name }}' expression
+                    param_name = key[0][1]
+                else:
+                    param_name = self._extract_param_name(tuple(key))
+
+                yield from self._bind_filter_tokens(
+                    last_token.lineno, filter_name, param_name
+                )
+            yield token
 
     @staticmethod
-    def _extract_param_name(tokens: list[Token]) -> str:
+    @functools.lru_cache(maxsize=512)
+    def _bind_filter_tokens(
+        lineno: int, filter_name: str, param_name: str
+    ) -> tuple[Token, ...]:
+        """Get the tokens closing a variable expression with a bind filter."""
+        return (
+            Token(lineno, "rparen", ")"),
+            Token(lineno, "pipe", "|"),
+            Token(lineno, "name", filter_name),
+            Token(lineno, "lparen", "("),
+            Token(lineno, "string", param_name),
+            Token(lineno, "rparen", ")"),
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _extract_param_name(key: tuple[tuple[str, str], ...]) -> str:
         """Extract the parameter name."""
-        name = ""
-        for token in tokens:
-            if token.test("variable_begin"):
-                continue
-            elif token.test("name"):
-                name += token.value
-            elif token.test("dot"):
-                name += token.value
-            else:
-                break
-        if not name:
-            name = "bind_0"
-        return name
+        if not key:
+            return "bind_0"
+        return "".join(value for _, value in key)
+
+
+def _resolve_param_style_func(
+    param_style: ParamStyle | ParamStyleFunc,
+) -> ParamStyleFunc:
+    """Resolve the param_style into a placeholder formatting function."""
+    if callable(param_style):
+        return param_style
+    try:
+        return _PARAM_STYLE_FORMATTERS[param_style]
+    except KeyError:
+        raise ValueError(f"Invalid param_style - {param_style}") from None
+
+
+def _compile_settings(environment: jinja2.Environment) -> tuple[Hashable, ...]:
+    """Get the environment settings that change the compiled template code."""
+    return (
+        environment.block_start_string,
+        environment.block_end_string,
+        environment.variable_start_string,
+        environment.variable_end_string,
+        environment.comment_start_string,
+        environment.comment_end_string,
+        environment.line_statement_prefix,
+        environment.line_comment_prefix,
+        environment.trim_blocks,
+        environment.lstrip_blocks,
+        environment.newline_sequence,
+        environment.keep_trailing_newline,
+        environment.optimized,
+        environment.is_async,
+    )
 
 
 def _is_positional_param_style(param_style: ParamStyle | ParamStyleFunc) -> bool:
     """Check if the param_style is positional."""
     return (
-        param_style
-        in (
-            "qmark",
-            "format",
-            "numeric",
-            "asyncpg",
-        )
+        param_style in _POSITIONAL_PARAM_STYLES
         or callable(param_style)
         and "key" not in param_style("key", 0)
     )
+
+
+def _render_cache_value_key(value: Any) -> Hashable:
+    """Get the rendered query cache key of a context value.
+
+    Only immutable scalars and tuples of them can be cached. The type is part of
+    the key, because values such as 1, True and 1.0 compare equal.
+    """
+    value_type = type(value)
+    if value_type in _RENDER_CACHE_SCALAR_TYPES:
+        return value_type, value
+    if value_type is float:
+        # 0.0 and -0.0 compare equal too
+        return value_type, value.hex()
+    if value_type is tuple:
+        return value_type, tuple(_render_cache_value_key(item) for item in value)
+    raise TypeError(f"Context values of type {value_type.__name__} can't be cached")
@@ -18,9 +18,9 @@ def sql_path() -> pathlib.Path:
 
 @pytest.fixture(scope="session")
 def j2sql(sql_path: pathlib.Path) -> Jinja2SQL:
-    return Jinja2SQL(searchpath=sql_path)
+    return Jinja2SQL(searchpath=sql_path, auto_reload=False)
 
 
 @pytest.fixture(scope="session")
 def async_j2sql(sql_path: pathlib.Path) -> Jinja2SQL:
-    return Jinja2SQL(searchpath=sql_path, enable_async=True)
+    return Jinja2SQL(searchpath=sql_path, auto_reload=False, enable_async=True)
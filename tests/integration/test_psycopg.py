@@ -1,3 +1,6 @@
+from __future__ import annotations
+
+import time
 from collections.abc import Iterator
 
 import psycopg
@@ -9,15 +12,30 @@ from jinja2sql import Jinja2SQL
 from jinja2sql._core import ParamStyle
 
 
-def _psycopg_check_alive(conninfo: str) -> bool:
+def _psycopg_connect(conninfo: str) -> psycopg.Connection | None:
     try:
         conn = psycopg.connect(conninfo)
-        cur = conn.cursor()
-        cur.execute("SELECT 1")
-        conn.close()
     except psycopg.DatabaseError:
-        return False
-    return True
+        return None
+    try:
+        conn.execute("SELECT 1")
+    except psycopg.DatabaseError:
+        conn.close()
+        return None
+    return conn
+
+
+def _wait_until_connected(
+    conninfo: str, timeout: float = 60.0, max_pause: float = 2.0
+) -> psycopg.Connection:
+    deadline = time.monotonic() + timeout
+    pause = 0.05
+    while (conn := _psycopg_connect(conninfo)) is None:
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Timeout reached while waiting on psycopg service!")
+        time.sleep(pause)
+        pause = min(pause * 2, max_pause)
+    return conn
 
 
 @pytest.fixture(scope="module")
@@ -36,13 +54,7 @@ def conn(
         port=port,
     )
 
-    docker_services.wait_until_responsive(
-        timeout=60.0,
-        pause=0.5,
-        check=lambda: _psycopg_check_alive(conninfo),
-    )
-
-    conn = psycopg.connect(conninfo)
+    conn = _wait_until_connected(conninfo)
 
     query, _ = j2sql.from_file("postgres/schema.sql")
     conn.execute(query)
@@ -12,10 +12,10 @@ def conn(j2sql: Jinja2SQL) -> Iterator[sqlite3.Connection]:
     conn = sqlite3.connect(":memory:")
 
     query, _ = j2sql.from_file("sqlite/schema.sql")
-    conn.execute(query)
+    conn.executescript(query)
 
     query, _ = j2sql.from_file("sqlite/users.sql")
-    conn.execute(query)
+    conn.executescript(query)
 
     yield conn
 
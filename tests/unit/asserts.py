@@ -1,10 +1,13 @@
 import re
-from textwrap import dedent
+
+_WHITESPACE_RE = re.compile(r"\s+")
 
 
 def assert_sql(sql: str, other: str) -> None:
+    if sql == other:
+        return
     assert _normalize_sql(sql) == _normalize_sql(other), "SQL strings do not match"
 
 
 def _normalize_sql(sql: str) -> str:
-    return re.sub(r"\s+", " ", dedent(sql).strip().lower())
+    return _WHITESPACE_RE.sub(" ", sql.strip().lower())
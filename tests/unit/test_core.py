@@ -1,8 +1,10 @@
 import pathlib
+from typing import Any, Literal, NoReturn, Optional
 
+import jinja2
 import pytest
 
-from jinja2sql import Jinja2SQL
+from jinja2sql import Jinja2SQL, MemoryBytecodeCache
 from jinja2sql._core import ParamStyle
 
 from tests.unit.asserts import assert_sql
@@ -15,12 +17,12 @@ def sql_path() -> pathlib.Path:
 
 @pytest.fixture(scope="session")
 def j2sql(sql_path: pathlib.Path) -> Jinja2SQL:
-    return Jinja2SQL(searchpath=sql_path)
+    return Jinja2SQL(searchpath=sql_path, auto_reload=False)
 
 
 @pytest.fixture(scope="session")
 def async_j2sql(sql_path: pathlib.Path) -> Jinja2SQL:
-    return Jinja2SQL(searchpath=sql_path, enable_async=True)
+    return Jinja2SQL(searchpath=sql_path, auto_reload=False, enable_async=True)
 
 
 @pytest.mark.parametrize(
@@ -187,6 +189,34 @@ def test_bind_in_loop(j2sql: Jinja2SQL) -> None:
     assert params == {"param__1": "one", "param__2": "two"}
 
 
+def test_invalid_param_style(j2sql: Jinja2SQL) -> None:
+    with pytest.raises(ValueError, match="Invalid param_style - unknown"):
+        j2sql.from_string(
+            "SELECT * FROM table WHERE param = {{ param }}",
+            context={"param": "value"},
+            param_style="unknown",  # type: ignore[arg-type]
+        )
+
+
+def test_bind_attribute_param_name(j2sql: Jinja2SQL) -> None:
+    query, params = j2sql.from_string(
+        "SELECT * FROM users WHERE email = {{ user.email }} AND id = {{ ids[0] }}",
+        context={"user": {"email": "user@example.com"}, "ids": [1]},
+    )
+
+    assert_sql(
+        query, "SELECT * FROM users WHERE email = :user__email__1 AND id = :ids__2"
+    )
+    assert params == {"user__email__1": "user@example.com", "ids__2": 1}
+
+
+def test_bind_undefined_param(j2sql: Jinja2SQL) -> None:
+    with pytest.raises(
+        jinja2.UndefinedError, match="Undefined parameter 'param' used in query."
+    ):
+        j2sql.from_string("SELECT * FROM table WHERE param = {{ param }}")
+
+
 def test_identifier(j2sql: Jinja2SQL) -> None:
     query, params = j2sql.from_string(
         "SELECT * FROM {{ table | identifier }}",
@@ -198,6 +228,36 @@ def test_identifier(j2sql: Jinja2SQL) -> None:
     assert params == []
 
 
+def test_identifier_with_quote_char(j2sql: Jinja2SQL) -> None:
+    query, params = j2sql.from_string(
+        "SELECT * FROM {{ table | identifier }}",
+        context={"table": ("public", 'user"s')},
+        identifier_quote_char='"',
+    )
+
+    assert_sql(query, 'SELECT * FROM "public"."user""s"')
+    assert params == {}
+
+
+def test_identifier_without_quote_char(j2sql: Jinja2SQL) -> None:
+    query, params = j2sql.from_string(
+        "SELECT * FROM {{ table | identifier }}",
+        context={"table": ["public", "user"]},
+    )
+
+    assert_sql(query, "SELECT * FROM public.user")
+    assert params == {}
+
+
+def test_identifier_invalid_value(j2sql: Jinja2SQL) -> None:
+    with pytest.raises(
+        ValueError, match="identifier filter expects a string or an Iterable"
+    ):
+        j2sql.from_string(
+            "SELECT * FROM {{ table | identifier }}", context={"table": 1}
+        )
+
+
 def test_safe_sql(j2sql: Jinja2SQL) -> None:
     query, params = j2sql.from_string(
         "SELECT * FROM table WHERE param = '{{ param | safe }}'",
@@ -226,7 +286,7 @@ def test_from_file(j2sql: Jinja2SQL) -> None:
     assert params == [param1, param2]
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_from_string_async(async_j2sql: Jinja2SQL) -> None:
     param1 = "value1"
 
@@ -242,7 +302,7 @@ async def test_from_string_async(async_j2sql: Jinja2SQL) -> None:
     assert params == [param1]
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_from_file_async(async_j2sql: Jinja2SQL) -> None:
     param1 = "value1"
     param2 = "value2"
@@ -260,6 +320,18 @@ async def test_from_file_async(async_j2sql: Jinja2SQL) -> None:
     assert params == [param1, param2]
 
 
+@pytest.mark.parametrize(
+    "method, source",
+    [("from_string_async", "SELECT 1"), ("from_file_async", "query1.sql")],
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_render_async_disabled(
+    j2sql: Jinja2SQL, method: str, source: str
+) -> None:
+    with pytest.raises(RuntimeError, match="Async rendering is disabled"):
+        await getattr(j2sql, method)(source)
+
+
 def test_register_filter(j2sql: Jinja2SQL) -> None:
     j2sql.register_filter("custom_filter", lambda value: f"{value}_with_filter")
 
@@ -321,3 +393,255 @@ def test_filter_decorator_with_self(j2sql: Jinja2SQL) -> None:
 
     assert_sql(query, "SELECT ARRAY['0', '1'] AS array")
     assert params == {}
+
+
+def test_from_file_bytecode_cache(
+    sql_path: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "query2.sql").write_text("SELECT 1")
+    j2sql = Jinja2SQL(searchpath=[sql_path, tmp_path], cache_size=1)
+    bytecode_cache = j2sql.env.bytecode_cache
+    context = {"param1": "value1", "param2": "value2"}
+
+    assert isinstance(bytecode_cache, MemoryBytecodeCache)
+    assert bytecode_cache._cache.capacity == 1
+
+    j2sql.from_file("query1.sql", context=context)
+
+    assert len(bytecode_cache._cache) == 1
+
+    def fail_compile(*args: Any, **kwargs: Any) -> NoReturn:
+        raise AssertionError("Template compiled instead of loaded from bytecode.")
+
+    monkeypatch.setattr(j2sql.env, "compile", fail_compile)
+    j2sql.env.cache.clear()  # type: ignore[union-attr]
+    query, params = j2sql.from_file("query1.sql", context=context)
+
+    assert_sql(
+        query, "SELECT * FROM table WHERE param1 = :param1__1 AND param2 = :param2__2"
+    )
+    assert params == {"param1__1": "value1", "param2__2": "value2"}
+
+    monkeypatch.undo()
+    j2sql.from_file("query2.sql")
+
+    assert len(bytecode_cache._cache) == 1
+
+
+def test_from_string_template_cache() -> None:
+    j2sql = Jinja2SQL(cache_size=1)
+    source1 = "SELECT * FROM table WHERE param = {{ param }}"
+    source2 = "SELECT * FROM table WHERE param IN {{ param | inclause }}"
+
+    j2sql.from_string(source1, context={"param": "value"})
+    query, params = j2sql.from_string(source1, context={"param": "other"})
+
+    assert_sql(query, "SELECT * FROM table WHERE param = :param__1")
+    assert params == {"param__1": "other"}
+    assert list(j2sql._string_template_cache) == [source1]
+
+    j2sql.from_string(source2, context={"param": ["value"]})
+
+    assert list(j2sql._string_template_cache) == [source2]
+
+
+@pytest.mark.parametrize("compression", ["deflated", None])
+def test_precompile(
+    j2sql: Jinja2SQL, tmp_path: pathlib.Path, compression: Optional[Literal["deflated"]]
+) -> None:
+    target = tmp_path / "compiled"
+    j2sql.precompile(target, compression=compression)
+
+    compiled_j2sql = Jinja2SQL(compiled_path=target)
+    query, params = compiled_j2sql.from_file(
+        "query1.sql",
+        context={"param1": "value1", "param2": "value2"},
+        param_style="numeric",
+    )
+
+    assert_sql(query, "SELECT * FROM table WHERE param1 = :1 AND param2 = :2")
+    assert params == ["value1", "value2"]
+
+
+def test_compiled_path_with_searchpath(
+    sql_path: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    with pytest.raises(
+        ValueError, match="Pass either searchpath or compiled_path, not both."
+    ):
+        Jinja2SQL(searchpath=sql_path, compiled_path=tmp_path)
+
+
+def test_render_cache() -> None:
+    j2sql = Jinja2SQL(render_cache_size=10)
+    source = "SELECT * FROM table WHERE param = {{ param }}"
+
+    query1, params1 = j2sql.from_string(source, context={"param": "value"})
+    query2, params2 = j2sql.from_string(source, context={"param": "value"})
+    query3, params3 = j2sql.from_string(
+        source, context={"param": "value"}, param_style="qmark"
+    )
+
+    assert len(j2sql._render_cache) == 2
+    assert query1 == query2
+    assert params1 == params2 == {"param__1": "value"}
+    assert params1 is not params2
+    assert_sql(query3, "SELECT * FROM table WHERE param = ?")
+    assert params3 == ["value"]
+
+
+def test_render_cache_unhashable_context() -> None:
+    j2sql = Jinja2SQL(render_cache_size=10)
+
+    query, params = j2sql.from_string(
+        "SELECT * FROM table WHERE param IN {{ param | inclause }}",
+        context={"param": ["value1", "value2"]},
+    )
+
+    assert len(j2sql._render_cache) == 0
+    assert_sql(
+        query, "SELECT * FROM table WHERE param IN (:param__in__1, :param__in__2)"
+    )
+    assert params == {"param__in__1": "value1", "param__in__2": "value2"}
+
+
+def test_render_cache_equal_values_of_different_types() -> None:
+    j2sql = Jinja2SQL(render_cache_size=10)
+    source = "{{ a }}{% if a is sameas true %} AND flag{% endif %}"
+
+    query1, params1 = j2sql.from_string(source, context={"a": 1})
+    query2, params2 = j2sql.from_string(source, context={"a": True})
+
+    assert len(j2sql._render_cache) == 2
+    assert query1 == ":a__1"
+    assert params1 == {"a__1": 1}
+    assert query2 == ":a__1 AND flag"
+    assert params2 == {"a__1": True}
+    assert type(params2["a__1"]) is bool
+
+
+def test_render_cache_mutable_context_value() -> None:
+    class User:
+        email = "x"
+
+    j2sql = Jinja2SQL(render_cache_size=10)
+    user = User()
+
+    j2sql.from_string("{{ u.email }}", context={"u": user})
+    user.email = "y"
+    query, params = j2sql.from_string("{{ u.email }}", context={"u": user})
+
+    assert len(j2sql._render_cache) == 0
+    assert query == ":u__email__1"
+    assert params == {"u__email__1": "y"}
+
+
+def test_from_file_bytecode_cache_dir(
+    sql_path: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    j2sql = Jinja2SQL(searchpath=sql_path, bytecode_cache_dir=tmp_path)
+
+    query, params = j2sql.from_file(
+        "query1.sql",
+        context={"param1": "value1", "param2": "value2"},
+        param_style="numeric",
+    )
+
+    assert isinstance(j2sql.env.bytecode_cache, jinja2.FileSystemBytecodeCache)
+    assert len(list(tmp_path.glob("__jinja2sql_*.cache"))) == 1
+    assert_sql(query, "SELECT * FROM table WHERE param1 = :1 AND param2 = :2")
+    assert params == ["value1", "value2"]
+
+
+def test_from_file_bytecode_cache_dir_created(
+    sql_path: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    bytecode_cache_dir = tmp_path / "cache" / "jinja2sql"
+    j2sql = Jinja2SQL(searchpath=sql_path, bytecode_cache_dir=bytecode_cache_dir)
+
+    j2sql.from_file("query1.sql", context={"param1": "value1", "param2": "value2"})
+
+    assert len(list(bytecode_cache_dir.glob("__jinja2sql_*.cache"))) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_from_file_bytecode_cache_dir_shared_with_async(
+    sql_path: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    j2sql = Jinja2SQL(searchpath=sql_path, bytecode_cache_dir=tmp_path)
+    async_j2sql = Jinja2SQL(
+        searchpath=sql_path, bytecode_cache_dir=tmp_path, enable_async=True
+    )
+    context = {"param1": "value1", "param2": "value2"}
+
+    query1, params1 = j2sql.from_file("query1.sql", context=context)
+    query2, params2 = await async_j2sql.from_file_async("query1.sql", context=context)
+
+    assert len(list(tmp_path.glob("__jinja2sql_*.cache"))) == 2
+    assert query1 == query2
+    assert params1 == params2
+
+
+def test_from_file_bytecode_cache_dir_version(
+    sql_path: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    context = {"param1": "value1", "param2": "value2"}
+    Jinja2SQL(searchpath=sql_path, bytecode_cache_dir=tmp_path).from_file(
+        "query1.sql", context=context
+    )
+
+    monkeypatch.setattr("jinja2sql._core._BYTECODE_CACHE_VERSION", -1)
+    Jinja2SQL(searchpath=sql_path, bytecode_cache_dir=tmp_path).from_file(
+        "query1.sql", context=context
+    )
+
+    assert len(list(tmp_path.glob("__jinja2sql_*.cache"))) == 2
+
+
+def test_shared_bytecode_cache(sql_path: pathlib.Path) -> None:
+    bytecode_cache = MemoryBytecodeCache()
+    j2sql1 = Jinja2SQL(searchpath=sql_path, bytecode_cache=bytecode_cache)
+    j2sql2 = Jinja2SQL(searchpath=sql_path, bytecode_cache=bytecode_cache)
+    context = {"param1": "value1", "param2": "value2"}
+
+    query1, params1 = j2sql1.from_file("query1.sql", context=context)
+    query2, params2 = j2sql2.from_file("query1.sql", context=context)
+
+    assert len(bytecode_cache._cache) == 1
+    assert query1 == query2
+    assert params1 == params2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_shared_bytecode_cache_with_different_settings(
+    sql_path: pathlib.Path,
+) -> None:
+    bytecode_cache = MemoryBytecodeCache()
+    j2sql = Jinja2SQL(searchpath=sql_path, bytecode_cache=bytecode_cache)
+    async_j2sql = Jinja2SQL(
+        searchpath=sql_path, bytecode_cache=bytecode_cache, enable_async=True
+    )
+    context = {"param1": "value1", "param2": "value2"}
+
+    query1, params1 = j2sql.from_file("query1.sql", context=context)
+    query2, params2 = await async_j2sql.from_file_async("query1.sql", context=context)
+
+    assert len(bytecode_cache._cache) == 2
+    assert query1 == query2
+    assert params1 == params2
+
+
+def test_trim_blocks() -> None:
+    j2sql = Jinja2SQL(trim_blocks=True, lstrip_blocks=True)
+
+    query, params = j2sql.from_string(
+        """SELECT * FROM table
+        {% if param %}
+        WHERE param = {{ param }}
+        {% endif %}
+        """,
+        context={"param": "value"},
+    )
+
+    assert query == "SELECT * FROM table\n        WHERE param = :param__1\n        "
+    assert params == {"param__1": "value"}